@@ -6,17 +6,23 @@ Implements three-agent sequential workflow:
 3. Optimization Advisor (Report generation)
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel, HttpUrl, Field, validator
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, HttpUrl, Field, ValidationError, validator
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple, Callable, Set
 import logging
 import os
 import asyncio
-import json
+import orjson
 import httpx
+import aiohttp
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 from datetime import datetime
-import subprocess
 import re
+import uuid
+from urllib.parse import urlparse
+
+from cache import response_cache, record_store, make_key
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -33,11 +39,182 @@ SERP_API_KEY = os.getenv("SERP_API_KEY", "")
 # Choose LLM provider (openai or anthropic)
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
 
-# Model configuration
+# Model configuration per agent: a fast tier for the structured extraction
+# agents (auditor, serp) and a stronger tier for the long-form report (advisor)
 if LLM_PROVIDER == "anthropic":
-    LLM_MODEL = "claude-3-5-sonnet-20241022"
+    _DEFAULT_MODELS = {
+        "auditor": "claude-3-5-haiku-20241022",
+        "serp": "claude-3-5-haiku-20241022",
+        "advisor": "claude-3-5-sonnet-20241022"
+    }
 else:
-    LLM_MODEL = "gpt-4o-mini"
+    _DEFAULT_MODELS = {
+        "auditor": "gpt-4o-mini",
+        "serp": "gpt-4o-mini",
+        "advisor": "gpt-4o"
+    }
+
+LLM_MODELS = {
+    agent: os.getenv(f"MODEL_{agent.upper()}", default)
+    for agent, default in _DEFAULT_MODELS.items()
+}
+
+# Cache lifetimes (seconds) for upstream responses
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", "3600"))
+SERP_CACHE_TTL = int(os.getenv("SERP_CACHE_TTL", "86400"))
+
+# Fully validate agent JSON instead of trusting its shape (useful in staging).
+# OpenAI enforces the agents' strict JSON schema server-side; Anthropic's forced
+# tool input is not guaranteed to match it, so those replies are always validated.
+STRICT_VALIDATE = os.getenv("STRICT_VALIDATE", "0") == "1"
+VALIDATE_AGENT_OUTPUT = STRICT_VALIDATE or LLM_PROVIDER == "anthropic"
+
+# Completed/failed audits are kept for retrieval via GET /audit/{audit_id};
+# a completed audit is reused for repeat requests of the same URL (0 disables)
+AUDIT_RESULT_TTL = int(os.getenv("AUDIT_RESULT_TTL", "86400"))
+AUDIT_REUSE_TTL = int(os.getenv("AUDIT_REUSE_TTL", "3600"))
+
+# How long submitted batch metadata is kept (the OpenAI batch window is 24h)
+BATCH_STATE_TTL = int(os.getenv("BATCH_STATE_TTL", "172800"))
+
+# Pre-open upstream connections during application startup
+PREWARM_CONNECTIONS = os.getenv("PREWARM_CONNECTIONS", "1") == "1"
+
+# Page body excerpt sent to the Page Auditor; structural signals are extracted separately
+AUDITOR_CONTENT_CHARS = int(os.getenv("AUDITOR_CONTENT_CHARS", "2000"))
+
+
+# =============================================================================
+# Shared HTTP Client
+# =============================================================================
+
+# Created once in the application lifespan (see main.py) so every upstream
+# call reuses pooled keep-alive connections instead of a fresh TLS handshake.
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Build the pooled HTTP/2 client shared by all upstream API calls"""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(120.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60.0),
+        http2=True
+    )
+
+
+def set_http_client(client: Optional[httpx.AsyncClient]) -> None:
+    """Register (or clear) the shared HTTP client"""
+    global _http_client
+    _http_client = client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it lazily outside the app lifespan"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_http_client()
+    return _http_client
+
+
+# LLM calls go through aiohttp, which holds up better than httpx under many
+# concurrent long-running completions.
+_llm_session: Optional[aiohttp.ClientSession] = None
+
+
+def create_llm_session() -> aiohttp.ClientSession:
+    """Build the pooled aiohttp session used for OpenAI/Anthropic calls"""
+    return aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=120),
+        connector=aiohttp.TCPConnector(limit=200, limit_per_host=64, ttl_dns_cache=600, keepalive_timeout=60),
+        # Large prompt payloads are encoded with orjson rather than stdlib json
+        json_serialize=lambda obj: orjson.dumps(obj).decode()
+    )
+
+
+def set_llm_session(session: Optional[aiohttp.ClientSession]) -> None:
+    """Register (or clear) the shared LLM session"""
+    global _llm_session
+    _llm_session = session
+
+
+def get_llm_session() -> aiohttp.ClientSession:
+    """Return the shared LLM session, creating it lazily outside the app lifespan"""
+    global _llm_session
+    if _llm_session is None or _llm_session.closed:
+        _llm_session = create_llm_session()
+    return _llm_session
+
+
+async def _warm_llm_host(url: str) -> None:
+    async with get_llm_session().head(url, timeout=aiohttp.ClientTimeout(total=5)):
+        pass
+
+
+async def warm_up_connections() -> None:
+    """
+    Open connections to the configured upstream hosts at startup so DNS, TCP
+    and TLS are done before the first audit; failures are only logged
+    """
+    warmups = []
+    if FIRECRAWL_API_KEY:
+        warmups.append(get_http_client().head("https://api.firecrawl.dev", timeout=5.0))
+    if SERP_API_KEY:
+        warmups.append(get_http_client().head("https://serpapi.com", timeout=5.0))
+    if LLM_PROVIDER == "anthropic":
+        warmups.append(_warm_llm_host("https://api.anthropic.com"))
+    else:
+        warmups.append(_warm_llm_host("https://api.openai.com"))
+    
+    results = await asyncio.gather(*warmups, return_exceptions=True)
+    failures = [r for r in results if isinstance(r, BaseException)]
+    for failure in failures:
+        logger.warning(f"Connection warm-up failed: {failure!r}")
+    logger.info(f"Warmed {len(results) - len(failures)}/{len(results)} upstream connections")
+
+
+# =============================================================================
+# Upstream Concurrency & Retries
+# =============================================================================
+
+# Per-vendor caps on in-flight requests, sized to each account's rate-limit tier
+_openai_sem = asyncio.Semaphore(int(os.getenv("OPENAI_CONCURRENCY", "20")))
+_anthropic_sem = asyncio.Semaphore(int(os.getenv("ANTHROPIC_CONCURRENCY", "20")))
+_firecrawl_sem = asyncio.Semaphore(int(os.getenv("FIRECRAWL_CONCURRENCY", "10")))
+_serp_sem = asyncio.Semaphore(int(os.getenv("SERP_CONCURRENCY", "10")))
+
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "4"))
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Retry rate limits, 5xx responses and dropped connections (not timeouts)"""
+    if isinstance(exc, asyncio.TimeoutError):
+        return False
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status in RETRYABLE_STATUS_CODES
+    return isinstance(exc, (httpx.ConnectError, httpx.RemoteProtocolError, aiohttp.ClientConnectionError))
+
+
+def _is_rate_limited(exc: BaseException) -> bool:
+    """Retry only 429s, for non-idempotent calls the server may already have accepted"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429
+    return False
+
+
+def upstream_retrying(retryable: Callable[[BaseException], bool] = _is_retryable) -> AsyncRetrying:
+    """Exponential backoff with jitter for upstream API calls"""
+    return AsyncRetrying(
+        retry=retry_if_exception(retryable),
+        wait=wait_exponential_jitter(initial=1, max=20),
+        stop=stop_after_attempt(UPSTREAM_MAX_ATTEMPTS),
+        reraise=True
+    )
 
 
 # =============================================================================
@@ -92,6 +269,15 @@ class PageAuditOutput(BaseModel):
     target_keywords: TargetKeywords
 
 
+class PageAuditorFindings(BaseModel):
+    """Judgement fields produced by the Page Auditor LLM (the rest is extracted)"""
+    content_summary: str = ""
+    link_notes: str = ""
+    technical_findings: List[str] = []
+    content_opportunities: List[str] = []
+    target_keywords: TargetKeywords = TargetKeywords()
+
+
 class SerpResult(BaseModel):
     rank: int
     title: str
@@ -110,6 +296,27 @@ class SerpAnalysis(BaseModel):
     differentiation_opportunities: List[str] = []
 
 
+class BulkAuditRequest(BaseModel):
+    """Request model for running several full audits concurrently"""
+    urls: List[HttpUrl] = Field(..., min_length=1, max_length=100, description="URLs to audit")
+    max_concurrency: int = Field(8, ge=1, le=32, description="Audits run at the same time")
+
+
+class BatchAuditRequest(BaseModel):
+    """Request model for a bulk Page Auditor run via the OpenAI Batch API"""
+    urls: List[HttpUrl] = Field(..., min_length=1, max_length=500, description="URLs to audit")
+
+
+class BatchAuditResponse(BaseModel):
+    """Status (and, once completed, page audits) of a batch run"""
+    batch_id: str
+    status: str
+    page_audits: Dict[str, PageAuditOutput] = {}
+    failed: Dict[str, str] = {}
+    error: Optional[str] = None
+    timestamp: str
+
+
 class AuditResponse(BaseModel):
     """Response model for completed audit"""
     status: str
@@ -121,223 +328,195 @@ class AuditResponse(BaseModel):
     timestamp: str
 
 
-# =============================================================================
-# Agent Functions
-# =============================================================================
-
-async def call_llm(messages: List[Dict], response_format: Optional[Dict] = None, max_tokens: int = 4000) -> str:
-    """
-    Universal LLM caller supporting OpenAI and Anthropic
-    """
-    try:
-        if LLM_PROVIDER == "anthropic":
-            return await call_anthropic(messages, response_format, max_tokens)
-        else:
-            return await call_openai(messages, response_format, max_tokens)
-    except Exception as e:
-        logger.error(f"LLM API error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"LLM API error: {str(e)}")
+class BulkAuditResponse(BaseModel):
+    """Response model for a bulk audit, results in request order"""
+    completed: int
+    failed: int
+    results: List[AuditResponse]
+    timestamp: str
 
 
-async def call_openai(messages: List[Dict], response_format: Optional[Dict] = None, max_tokens: int = 4000) -> str:
-    """Call OpenAI API"""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+def build_page_audit(data: Dict[str, Any]) -> PageAuditOutput:
+    """Build PageAuditOutput from agent JSON, validating only where the schema is not enforced upstream"""
+    if VALIDATE_AGENT_OUTPUT:
+        return PageAuditOutput.model_validate(data)
     
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        payload = {
-            "model": LLM_MODEL,
-            "messages": messages,
-            "max_tokens": max_tokens,
-            "temperature": 0.7
-        }
-        
-        if response_format:
-            payload["response_format"] = response_format
-        
-        response = await client.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json=payload
-        )
-        response.raise_for_status()
-        result = response.json()
-        return result["choices"][0]["message"]["content"]
+    results = dict(data.get("audit_results") or {})
+    results["secondary_headings"] = [
+        HeadingItem.model_construct(**heading) for heading in results.get("secondary_headings") or []
+    ]
+    results["link_counts"] = LinkCounts.model_construct(**(results.get("link_counts") or {}))
+    return PageAuditOutput.model_construct(
+        audit_results=AuditResults.model_construct(**results),
+        target_keywords=TargetKeywords.model_construct(**(data.get("target_keywords") or {}))
+    )
 
 
-async def call_anthropic(messages: List[Dict], response_format: Optional[Dict] = None, max_tokens: int = 4000) -> str:
-    """Call Anthropic Claude API"""
-    if not ANTHROPIC_API_KEY:
-        raise HTTPException(status_code=500, detail="Anthropic API key not configured")
-    
-    # Convert OpenAI-style messages to Anthropic format
-    system_message = ""
-    anthropic_messages = []
-    
-    for msg in messages:
-        if msg["role"] == "system":
-            system_message = msg["content"]
-        else:
-            anthropic_messages.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
+def build_serp_analysis(data: Dict[str, Any]) -> SerpAnalysis:
+    """Build SerpAnalysis from agent JSON, validating only where the schema is not enforced upstream"""
+    if VALIDATE_AGENT_OUTPUT:
+        return SerpAnalysis.model_validate(data)
     
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        payload = {
-            "model": LLM_MODEL,
-            "max_tokens": max_tokens,
-            "messages": anthropic_messages
-        }
-        
-        if system_message:
-            payload["system"] = system_message
-        
-        response = await client.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": ANTHROPIC_API_KEY,
-                "anthropic-version": "2023-06-01",
-                "Content-Type": "application/json"
-            },
-            json=payload
-        )
-        response.raise_for_status()
-        result = response.json()
-        return result["content"][0]["text"]
+    data = dict(data)
+    data["top_10_results"] = [
+        SerpResult.model_construct(**result) for result in data.get("top_10_results") or []
+    ]
+    return SerpAnalysis.model_construct(**data)
 
 
-async def scrape_with_firecrawl(url: str) -> Dict[str, Any]:
+# =============================================================================
+# Structured Output Schemas
+# =============================================================================
+
+def strict_json_schema(model: type) -> Dict[str, Any]:
     """
-    Scrape webpage using Firecrawl API
+    JSON schema for a Pydantic model in the strict form structured outputs
+    require: $refs inlined, every property required, no additional properties
     """
-    if not FIRECRAWL_API_KEY:
-        raise HTTPException(status_code=500, detail="Firecrawl API key not configured")
+    schema = model.model_json_schema()
+    definitions = schema.pop("$defs", {})
     
-    logger.info(f"Scraping URL with Firecrawl: {url}")
+    def tighten(node: Any) -> Any:
+        if isinstance(node, list):
+            return [tighten(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+        # Pydantic wraps defaulted sub-model fields in a single-item allOf
+        if len(node.get("allOf", [])) == 1:
+            node = {**{key: value for key, value in node.items() if key != "allOf"}, **node["allOf"][0]}
+        if "$ref" in node:
+            return tighten(definitions[node["$ref"].rsplit("/", 1)[-1]])
+        node = {key: tighten(value) for key, value in node.items() if key != "default"}
+        if node.get("type") == "object" and "properties" in node:
+            node["required"] = list(node["properties"])
+            node["additionalProperties"] = False
+        return node
     
-    async with httpx.AsyncClient(timeout=90.0) as client:
-        try:
-            response = await client.post(
-                "https://api.firecrawl.dev/v1/scrape",
-                headers={
-                    "Authorization": f"Bearer {FIRECRAWL_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "url": url,
-                    "formats": ["markdown", "html", "links"],
-                    "onlyMainContent": True,
-                    "timeout": 90000
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if not data.get("success"):
-                raise HTTPException(status_code=500, detail="Firecrawl scraping failed")
-            
-            return data.get("data", {})
-        
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Firecrawl HTTP error: {e.response.status_code} - {e.response.text}")
-            raise HTTPException(status_code=500, detail=f"Firecrawl error: {str(e)}")
-        except Exception as e:
-            logger.error(f"Firecrawl error: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Scraping error: {str(e)}")
+    return tighten(schema)
 
 
-async def search_serp(query: str) -> List[Dict]:
-    """
-    Search SERP using SerpAPI
-    """
-    if not SERP_API_KEY:
-        logger.warning("SERP API key not configured, using mock data")
-        return generate_mock_serp_results(query)
-    
-    logger.info(f"Searching SERP for: {query}")
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.get(
-                "https://serpapi.com/search",
-                params={
-                    "q": query,
-                    "api_key": SERP_API_KEY,
-                    "num": 10,
-                    "engine": "google"
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            organic_results = data.get("organic_results", [])
-            return organic_results[:10]
-        
-        except Exception as e:
-            logger.error(f"SERP API error: {str(e)}")
-            return generate_mock_serp_results(query)
+def structured_output(name: str, model: type) -> Dict[str, Any]:
+    """OpenAI response_format enforcing the model's schema server-side"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "schema": strict_json_schema(model), "strict": True}
+    }
 
 
-def generate_mock_serp_results(query: str) -> List[Dict]:
-    """Generate mock SERP results for testing"""
-    return [
-        {
-            "position": i + 1,
-            "title": f"Result {i + 1}: {query} - Example Site",
-            "link": f"https://example{i + 1}.com/{query.replace(' ', '-')}",
-            "snippet": f"This is a comprehensive guide about {query}. Learn everything you need to know..."
-        }
-        for i in range(10)
-    ]
+_AUDITOR_RESPONSE_FORMAT = structured_output("page_audit_findings", PageAuditorFindings)
+_SERP_RESPONSE_FORMAT = structured_output("serp_analysis", SerpAnalysis)
 
 
-async def agent_page_auditor(url: str) -> PageAuditOutput:
+# =============================================================================
+# Page Signal Extraction
+# =============================================================================
+
+_CODE_FENCE_RE = re.compile(r"^(```|~~~).*?^\1", re.MULTILINE | re.DOTALL)
+_MARKDOWN_HEADING_RE = re.compile(r"^(#{1,4})[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+_MARKDOWN_LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_MARKDOWN_EMPHASIS_RE = re.compile(r"\*\*|__|\*|`")
+_MARKDOWN_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_BARE_URL_RE = re.compile(r"<?https?://\S+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _normalize_host(netloc: str) -> str:
+    host = netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def extract_seo_signals(url: str, scraped_data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Agent 1: Page Auditor
-    Scrapes the URL and performs on-page SEO analysis
+    Deterministically extract on-page SEO signals from a Firecrawl scrape:
+    title/meta from metadata, H1-H4 from the markdown, word and link counts
     """
-    logger.info(f"[Agent 1] Page Auditor analyzing: {url}")
+    markdown_content = scraped_data.get("markdown", "") or ""
+    links_data = scraped_data.get("links", []) or []
+    metadata = scraped_data.get("metadata", {}) or {}
     
-    # Scrape the page
-    scraped_data = await scrape_with_firecrawl(url)
+    prose = _CODE_FENCE_RE.sub("", markdown_content)
+    headings = [
+        {"tag": f"h{len(hashes)}", "text": _MARKDOWN_EMPHASIS_RE.sub("", _MARKDOWN_LINK_RE.sub(r"\1", text)).strip()}
+        for hashes, text in _MARKDOWN_HEADING_RE.findall(prose)
+    ]
+    # Words are counted on the visible text: images dropped, links reduced to their anchor text
+    visible_text = _BARE_URL_RE.sub(" ", _MARKDOWN_LINK_RE.sub(r"\1", _MARKDOWN_IMAGE_RE.sub(" ", prose)))
     
-    markdown_content = scraped_data.get("markdown", "")
-    html_content = scraped_data.get("html", "")
-    links_data = scraped_data.get("links", [])
-    metadata = scraped_data.get("metadata", {})
+    base_host = _normalize_host(urlparse(url).netloc)
+    internal = external = 0
+    for link in links_data:
+        parsed = urlparse(link)
+        # mailto:, tel:, javascript: and same-page #fragment links are not page links
+        if parsed.scheme not in ("", "http", "https"):
+            continue
+        if not parsed.netloc:
+            if parsed.path:
+                internal += 1
+        elif _normalize_host(parsed.netloc) == base_host:
+            internal += 1
+        else:
+            external += 1
     
-    # Prepare prompt for LLM analysis
-    analysis_prompt = f"""You are an expert SEO auditor. Analyze the following webpage data and provide a comprehensive on-page SEO audit.
+    return {
+        "title": metadata.get("title", "") or "",
+        "meta_description": metadata.get("description", "") or "",
+        "meta_keywords": metadata.get("keywords", "") or "",
+        "headings": headings,
+        "word_count": len(_WORD_RE.findall(visible_text)),
+        "link_counts": {
+            "internal": internal,
+            "external": external,
+            "total": internal + external
+        }
+    }
 
-URL: {url}
 
-METADATA:
-Title: {metadata.get('title', 'Not available')}
-Description: {metadata.get('description', 'Not available')}
-Keywords: {metadata.get('keywords', 'Not available')}
+def build_audit_skeleton(signals: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill the factual audit_results fields from extracted signals (no LLM involved)"""
+    headings = signals["headings"]
+    h1_headings = [h["text"] for h in headings if h["tag"] == "h1"]
+    return {
+        "title_tag": signals["title"],
+        "meta_description": signals["meta_description"],
+        "primary_heading": h1_headings[0] if h1_headings else "",
+        "secondary_headings": [h for h in headings if h["tag"] != "h1"],
+        "word_count": signals["word_count"],
+        "link_counts": {
+            "internal": signals["link_counts"]["internal"],
+            "external": signals["link_counts"]["external"],
+            # Links are not checked, so the broken count is unknown
+            "broken": None,
+            "notes": ""
+        }
+    }
+
+
+# =============================================================================
+# Prompt Templates
+# =============================================================================
+
+# Static prompt scaffolds are built once at import time; each agent only
+# fills in its per-request fields through the bound str.format.
+
+_AUDITOR_SYSTEM_MESSAGE = {"role": "system", "content": "You are an expert SEO auditor. Always respond with valid JSON only."}
+
+_AUDITOR_PROMPT = """You are an expert SEO auditor. Analyze the following webpage data and provide a comprehensive on-page SEO audit.
 
-MARKDOWN CONTENT:
-{markdown_content[:8000]}
+URL: {url}
+
+EXTRACTED PAGE SIGNALS (parsed from the page, exact):
+{signals}
 
-LINKS DATA:
-Total Links: {len(links_data)}
+CONTENT EXCERPT (first {content_chars} characters):
+{content}
 
 INSTRUCTIONS:
-1. Extract and analyze:
-   - Title tag (exact text)
-   - Meta description (exact text)
-   - Primary H1 heading
-   - Secondary headings (H2-H4) with their text
-   - Approximate word count
-   - Content summary (2-3 sentences)
-   
-2. Analyze links:
-   - Count internal vs external links
-   - Note any obvious issues
+The title, meta description, headings, word count and link counts above are
+exact and already recorded. Use them as evidence; do not restate them.
+
+1. Summarize the content (2-3 sentences)
+
+2. Note any obvious link issues (one short sentence)
    
 3. Identify technical SEO issues:
    - Missing elements
@@ -352,22 +531,10 @@ INSTRUCTIONS:
 
 Provide your response as a valid JSON object matching this structure:
 {{
-  "audit_results": {{
-    "title_tag": "...",
-    "meta_description": "...",
-    "primary_heading": "...",
-    "secondary_headings": [{{"tag": "h2", "text": "..."}}],
-    "word_count": 0,
-    "content_summary": "...",
-    "link_counts": {{
-      "internal": 0,
-      "external": 0,
-      "broken": 0,
-      "notes": "..."
-    }},
-    "technical_findings": ["..."],
-    "content_opportunities": ["..."]
-  }},
+  "content_summary": "...",
+  "link_notes": "...",
+  "technical_findings": ["..."],
+  "content_opportunities": ["..."],
   "target_keywords": {{
     "primary_keyword": "...",
     "secondary_keywords": ["..."],
@@ -376,49 +543,11 @@ Provide your response as a valid JSON object matching this structure:
   }}
 }}
 
-Return ONLY the JSON object, no other text."""
-
-    messages = [
-        {"role": "system", "content": "You are an expert SEO auditor. Always respond with valid JSON only."},
-        {"role": "user", "content": analysis_prompt}
-    ]
-    
-    response = await call_llm(messages, max_tokens=3000)
-    
-    # Parse JSON response
-    try:
-        # Clean the response
-        response = response.strip()
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.startswith("```"):
-            response = response[3:]
-        if response.endswith("```"):
-            response = response[:-3]
-        response = response.strip()
-        
-        audit_data = json.loads(response)
-        return PageAuditOutput(**audit_data)
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse LLM response as JSON: {e}")
-        logger.error(f"Response: {response}")
-        raise HTTPException(status_code=500, detail="Failed to parse audit results")
+Return ONLY the JSON object, no other text.""".format
 
+_SERP_SYSTEM_MESSAGE = {"role": "system", "content": "You are an expert SEO competitive analyst. Always respond with valid JSON only."}
 
-async def agent_serp_analyst(primary_keyword: str) -> SerpAnalysis:
-    """
-    Agent 2: SERP Analyst
-    Researches competitive landscape for the primary keyword
-    """
-    logger.info(f"[Agent 2] SERP Analyst researching: {primary_keyword}")
-    
-    # Get SERP results
-    serp_results = await search_serp(primary_keyword)
-    
-    # Prepare SERP data for analysis
-    serp_summary = json.dumps(serp_results[:10], indent=2)
-    
-    analysis_prompt = f"""You are an expert SEO competitive analyst. Analyze these Google search results for the keyword: "{primary_keyword}"
+_SERP_PROMPT = """You are an expert SEO competitive analyst. Analyze these Google search results for the keyword: "{primary_keyword}"
 
 SERP RESULTS (Top 10):
 {serp_summary}
@@ -459,55 +588,19 @@ Provide your response as a valid JSON object:
   "differentiation_opportunities": ["..."]
 }}
 
-Return ONLY the JSON object, no other text."""
-
-    messages = [
-        {"role": "system", "content": "You are an expert SEO competitive analyst. Always respond with valid JSON only."},
-        {"role": "user", "content": analysis_prompt}
-    ]
-    
-    response = await call_llm(messages, max_tokens=3000)
-    
-    # Parse JSON response
-    try:
-        # Clean the response
-        response = response.strip()
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.startswith("```"):
-            response = response[3:]
-        if response.endswith("```"):
-            response = response[:-3]
-        response = response.strip()
-        
-        serp_data = json.loads(response)
-        return SerpAnalysis(**serp_data)
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse SERP analysis: {e}")
-        logger.error(f"Response: {response}")
-        raise HTTPException(status_code=500, detail="Failed to parse SERP analysis")
+Return ONLY the JSON object, no other text.""".format
 
+_ADVISOR_SYSTEM_MESSAGE = {"role": "system", "content": "You are a senior SEO consultant creating detailed audit reports."}
 
-async def agent_optimization_advisor(
-    url: str,
-    page_audit: PageAuditOutput,
-    serp_analysis: SerpAnalysis
-) -> str:
-    """
-    Agent 3: Optimization Advisor
-    Synthesizes audit and SERP data into actionable report
-    """
-    logger.info("[Agent 3] Optimization Advisor generating report")
-    
-    report_prompt = f"""You are a senior SEO consultant creating a comprehensive optimization report.
+_ADVISOR_PROMPT = """You are a senior SEO consultant creating a comprehensive optimization report.
 
 TARGET URL: {url}
 
 PAGE AUDIT DATA:
-{json.dumps(page_audit.dict(), indent=2)}
+{page_audit}
 
 SERP COMPETITIVE ANALYSIS:
-{json.dumps(serp_analysis.dict(), indent=2)}
+{serp_analysis}
 
 INSTRUCTIONS:
 Create a professional SEO audit report in Markdown format with these sections:
@@ -603,64 +696,1127 @@ Create a professional SEO audit report in Markdown format with these sections:
 Be specific with data points (e.g., "Title is 45 characters, recommend 55-60").
 Use actual numbers and examples from the audit data.
 Make recommendations actionable and prioritized.
-"""
-
-    messages = [
-        {"role": "system", "content": "You are a senior SEO consultant creating detailed audit reports."},
-        {"role": "user", "content": report_prompt}
-    ]
-    
-    report = await call_llm(messages, max_tokens=4000)
-    
-    return report.strip()
+""".format
 
 
 # =============================================================================
-# API Endpoints
+# Agent Functions
 # =============================================================================
 
-@router.post("/audit", response_model=AuditResponse)
-async def run_seo_audit(request: AuditRequest):
+def _parse_agent_json(response: str, error_detail: str) -> Dict[str, Any]:
+    """Parse an agent's schema-constrained JSON reply, raising HTTPException(500) if it is not an object"""
+    try:
+        data = orjson.loads(response)
+    except orjson.JSONDecodeError as e:
+        logger.error(f"{error_detail}: {e}")
+        logger.error(f"Response: {response}")
+        raise HTTPException(status_code=500, detail=error_detail)
+    
+    if not isinstance(data, dict):
+        logger.error(f"{error_detail}: expected a JSON object")
+        logger.error(f"Response: {response}")
+        raise HTTPException(status_code=500, detail=error_detail)
+    return data
+
+
+async def call_llm(
+    messages: List[Dict],
+    response_format: Optional[Dict] = None,
+    max_tokens: int = 4000,
+    temperature: Optional[float] = None,
+    json_mode: bool = False,
+    model: Optional[str] = None
+) -> str:
     """
-    Main endpoint: Runs complete 3-agent SEO audit workflow
+    Universal LLM caller supporting OpenAI and Anthropic
+    model defaults to the advisor tier; see LLM_MODELS.
+    json_mode forces temperature=0 and, unless a response_format is given, a JSON-object format.
+    A json_schema response_format is enforced natively by OpenAI and via a forced tool call on Anthropic.
+    Deterministic calls (temperature=0) are served from the response cache when possible.
     """
-    audit_id = f"audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    url = str(request.url)
+    model = model or LLM_MODELS["advisor"]
+    if json_mode:
+        temperature = 0.0
+        if response_format is None:
+            response_format = {"type": "json_object"}
+    
+    cache_key = None
+    if temperature == 0:
+        cache_key = make_key(LLM_PROVIDER, model, messages, response_format, max_tokens)
+        cached = await response_cache.get("llm", cache_key)
+        if cached is not None:
+            logger.info("LLM response served from cache")
+            return cached
     
     try:
-        logger.info(f"Starting SEO audit for: {url}")
-        
-        # Agent 1: Page Auditor
-        page_audit = await agent_page_auditor(url)
-        logger.info(f"Page audit complete. Primary keyword: {page_audit.target_keywords.primary_keyword}")
-        
-        # Agent 2: SERP Analyst
-        serp_analysis = await agent_serp_analyst(page_audit.target_keywords.primary_keyword)
-        logger.info(f"SERP analysis complete. Found {len(serp_analysis.top_10_results)} competitors")
-        
-        # Agent 3: Optimization Advisor
-        report = await agent_optimization_advisor(url, page_audit, serp_analysis)
+        if LLM_PROVIDER == "anthropic":
+            content = await call_anthropic(messages, response_format, max_tokens, temperature, model)
+        else:
+            content = await call_openai(messages, response_format, max_tokens, temperature, model)
+    except Exception as e:
+        logger.error(f"LLM API error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"LLM API error: {str(e)}")
+    
+    if cache_key is not None:
+        await response_cache.set("llm", cache_key, content, LLM_CACHE_TTL)
+    return content
+
+
+async def call_openai(
+    messages: List[Dict],
+    response_format: Optional[Dict] = None,
+    max_tokens: int = 4000,
+    temperature: Optional[float] = None,
+    model: Optional[str] = None
+) -> str:
+    """Call OpenAI API"""
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+    
+    payload = {
+        "model": model or LLM_MODELS["advisor"],
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": 0.7 if temperature is None else temperature
+    }
+    
+    if response_format:
+        payload["response_format"] = response_format
+    
+    async for attempt in upstream_retrying():
+        with attempt:
+            async with _openai_sem:
+                async with get_llm_session().post(
+                    "https://api.openai.com/v1/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {OPENAI_API_KEY}",
+                        "Content-Type": "application/json"
+                    },
+                    json=payload
+                ) as response:
+                    response.raise_for_status()
+                    result = await response.json(loads=orjson.loads)
+    return result["choices"][0]["message"]["content"]
+
+
+async def call_anthropic(
+    messages: List[Dict],
+    response_format: Optional[Dict] = None,
+    max_tokens: int = 4000,
+    temperature: Optional[float] = None,
+    model: Optional[str] = None
+) -> str:
+    """Call Anthropic Claude API"""
+    if not ANTHROPIC_API_KEY:
+        raise HTTPException(status_code=500, detail="Anthropic API key not configured")
+    
+    # Convert OpenAI-style messages to Anthropic format
+    system_message = ""
+    anthropic_messages = []
+    
+    for msg in messages:
+        if msg["role"] == "system":
+            system_message = msg["content"]
+        else:
+            anthropic_messages.append({
+                "role": msg["role"],
+                "content": msg["content"]
+            })
+    
+    payload = {
+        "model": model or LLM_MODELS["advisor"],
+        "max_tokens": max_tokens,
+        "messages": anthropic_messages
+    }
+    
+    if system_message:
+        payload["system"] = system_message
+    
+    if temperature is not None:
+        payload["temperature"] = temperature
+    
+    # Anthropic has no response_format; a JSON schema is enforced by forcing a
+    # single tool call whose input must match it
+    tool_name = None
+    if response_format and response_format.get("type") == "json_schema":
+        spec = response_format["json_schema"]
+        tool_name = spec["name"]
+        payload["tools"] = [{
+            "name": tool_name,
+            "description": "Record the structured result.",
+            "input_schema": spec["schema"]
+        }]
+        payload["tool_choice"] = {"type": "tool", "name": tool_name}
+    
+    async for attempt in upstream_retrying():
+        with attempt:
+            async with _anthropic_sem:
+                async with get_llm_session().post(
+                    "https://api.anthropic.com/v1/messages",
+                    headers={
+                        "x-api-key": ANTHROPIC_API_KEY,
+                        "anthropic-version": "2023-06-01",
+                        "Content-Type": "application/json"
+                    },
+                    json=payload
+                ) as response:
+                    response.raise_for_status()
+                    result = await response.json(loads=orjson.loads)
+    
+    if tool_name:
+        for block in result["content"]:
+            if block.get("type") == "tool_use" and block.get("name") == tool_name:
+                return orjson.dumps(block["input"]).decode()
+    return result["content"][0]["text"]
+
+
+async def stream_llm(
+    messages: List[Dict],
+    max_tokens: int = 4000,
+    temperature: Optional[float] = None,
+    model: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of call_llm: yields text deltas as the model generates them
+    """
+    try:
+        if LLM_PROVIDER == "anthropic":
+            stream = stream_anthropic(messages, max_tokens, temperature, model)
+        else:
+            stream = stream_openai(messages, max_tokens, temperature, model)
+        async for delta in stream:
+            yield delta
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"LLM streaming error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"LLM API error: {str(e)}")
+
+
+async def iter_sse_data(response: aiohttp.ClientResponse) -> AsyncIterator[bytes]:
+    """Yield the data field of each server-sent event in a streaming response"""
+    async for line in response.content:
+        line = line.strip()
+        if line.startswith(b"data:"):
+            yield line[5:].strip()
+
+
+async def stream_openai(
+    messages: List[Dict],
+    max_tokens: int = 4000,
+    temperature: Optional[float] = None,
+    model: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Stream a chat completion from the OpenAI API"""
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+    
+    payload = {
+        "model": model or LLM_MODELS["advisor"],
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": 0.7 if temperature is None else temperature,
+        "stream": True
+    }
+    
+    # Only opening the stream is retried; deltas already yielded cannot be replayed.
+    # The semaphore is taken per attempt so no slot is held during backoff.
+    async for attempt in upstream_retrying():
+        with attempt:
+            await _openai_sem.acquire()
+            try:
+                response = await get_llm_session().post(
+                    "https://api.openai.com/v1/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {OPENAI_API_KEY}",
+                        "Content-Type": "application/json"
+                    },
+                    json=payload
+                )
+                response.raise_for_status()
+            except BaseException:
+                _openai_sem.release()
+                raise
+    
+    try:
+        async with response:
+            async for data in iter_sse_data(response):
+                if data == b"[DONE]":
+                    return
+                chunk = orjson.loads(data)
+                if chunk.get("error"):
+                    raise HTTPException(status_code=502, detail=f"OpenAI stream error: {chunk['error']}")
+                choices = chunk.get("choices") or []
+                if choices:
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+        raise HTTPException(status_code=502, detail="OpenAI stream ended before completion")
+    finally:
+        _openai_sem.release()
+
+
+async def stream_anthropic(
+    messages: List[Dict],
+    max_tokens: int = 4000,
+    temperature: Optional[float] = None,
+    model: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Stream a message from the Anthropic Claude API"""
+    if not ANTHROPIC_API_KEY:
+        raise HTTPException(status_code=500, detail="Anthropic API key not configured")
+    
+    system_message = ""
+    anthropic_messages = []
+    
+    for msg in messages:
+        if msg["role"] == "system":
+            system_message = msg["content"]
+        else:
+            anthropic_messages.append({
+                "role": msg["role"],
+                "content": msg["content"]
+            })
+    
+    payload = {
+        "model": model or LLM_MODELS["advisor"],
+        "max_tokens": max_tokens,
+        "messages": anthropic_messages,
+        "stream": True
+    }
+    
+    if system_message:
+        payload["system"] = system_message
+    
+    if temperature is not None:
+        payload["temperature"] = temperature
+    
+    # Only opening the stream is retried; deltas already yielded cannot be replayed.
+    # The semaphore is taken per attempt so no slot is held during backoff.
+    async for attempt in upstream_retrying():
+        with attempt:
+            await _anthropic_sem.acquire()
+            try:
+                response = await get_llm_session().post(
+                    "https://api.anthropic.com/v1/messages",
+                    headers={
+                        "x-api-key": ANTHROPIC_API_KEY,
+                        "anthropic-version": "2023-06-01",
+                        "Content-Type": "application/json"
+                    },
+                    json=payload
+                )
+                response.raise_for_status()
+            except BaseException:
+                _anthropic_sem.release()
+                raise
+    
+    try:
+        async with response:
+            async for data in iter_sse_data(response):
+                event = orjson.loads(data)
+                if event.get("type") == "message_stop":
+                    return
+                if event.get("type") == "error":
+                    raise HTTPException(status_code=502, detail=f"Anthropic stream error: {event.get('error')}")
+                if event.get("type") == "content_block_delta":
+                    delta = event.get("delta", {})
+                    if delta.get("type") == "text_delta":
+                        yield delta.get("text", "")
+        raise HTTPException(status_code=502, detail="Anthropic stream ended before completion")
+    finally:
+        _anthropic_sem.release()
+
+
+async def submit_openai_batch(requests: List[Dict]) -> Dict[str, Any]:
+    """Upload chat-completion requests as JSONL and create an OpenAI batch (24h window)"""
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+    
+    headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
+    jsonl = b"\n".join(orjson.dumps(request) for request in requests)
+    
+    async for attempt in upstream_retrying():
+        with attempt:
+            async with _openai_sem:
+                upload = await get_http_client().post(
+                    "https://api.openai.com/v1/files",
+                    headers=headers,
+                    data={"purpose": "batch"},
+                    files={"file": ("page_audits.jsonl", jsonl, "application/jsonl")},
+                    timeout=120.0
+                )
+                upload.raise_for_status()
+    
+    # Creating a batch is not idempotent: a retried 5xx or dropped connection
+    # may already have been accepted, and would create (and bill) a second batch
+    async for attempt in upstream_retrying(_is_rate_limited):
+        with attempt:
+            async with _openai_sem:
+                batch = await get_http_client().post(
+                    "https://api.openai.com/v1/batches",
+                    headers=headers,
+                    json={
+                        "input_file_id": orjson.loads(upload.content)["id"],
+                        "endpoint": "/v1/chat/completions",
+                        "completion_window": "24h"
+                    },
+                    timeout=30.0
+                )
+                batch.raise_for_status()
+    return orjson.loads(batch.content)
+
+
+async def get_openai_batch(batch_id: str) -> Dict[str, Any]:
+    """Fetch an OpenAI batch object"""
+    async for attempt in upstream_retrying():
+        with attempt:
+            async with _openai_sem:
+                response = await get_http_client().get(
+                    f"https://api.openai.com/v1/batches/{batch_id}",
+                    headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+                    timeout=30.0
+                )
+                response.raise_for_status()
+    return orjson.loads(response.content)
+
+
+async def download_openai_file(file_id: str) -> bytes:
+    """Download the raw content of an OpenAI file (e.g. batch output JSONL)"""
+    async for attempt in upstream_retrying():
+        with attempt:
+            async with _openai_sem:
+                response = await get_http_client().get(
+                    f"https://api.openai.com/v1/files/{file_id}/content",
+                    headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+                    timeout=120.0
+                )
+                response.raise_for_status()
+    return response.content
+
+
+async def scrape_with_firecrawl(url: str) -> Dict[str, Any]:
+    """
+    Scrape webpage using Firecrawl API
+    """
+    if not FIRECRAWL_API_KEY:
+        raise HTTPException(status_code=500, detail="Firecrawl API key not configured")
+    
+    cached = await response_cache.get("scrape", make_key(url))
+    if cached is not None:
+        logger.info(f"Scrape served from cache: {url}")
+        return cached
+    
+    logger.info(f"Scraping URL with Firecrawl: {url}")
+    
+    try:
+        async for attempt in upstream_retrying():
+            with attempt:
+                async with _firecrawl_sem:
+                    response = await get_http_client().post(
+                        "https://api.firecrawl.dev/v1/scrape",
+                        headers={
+                            "Authorization": f"Bearer {FIRECRAWL_API_KEY}",
+                            "Content-Type": "application/json"
+                        },
+                        json={
+                            "url": url,
+                            "formats": ["markdown", "links"],
+                            "onlyMainContent": True,
+                            "timeout": 90000
+                        },
+                        timeout=90.0
+                    )
+                    response.raise_for_status()
+        data = orjson.loads(response.content)
+        
+        if not data.get("success"):
+            raise HTTPException(status_code=500, detail="Firecrawl scraping failed")
+        
+        scraped = data.get("data", {})
+        await response_cache.set("scrape", make_key(url), scraped, SCRAPE_CACHE_TTL)
+        return scraped
+    
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Firecrawl HTTP error: {e.response.status_code} - {e.response.text}")
+        raise HTTPException(status_code=500, detail=f"Firecrawl error: {str(e)}")
+    except Exception as e:
+        logger.error(f"Firecrawl error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Scraping error: {str(e)}")
+
+
+async def search_serp(query: str) -> List[Dict]:
+    """
+    Search SERP using SerpAPI
+    """
+    if not SERP_API_KEY:
+        logger.warning("SERP API key not configured, using mock data")
+        return generate_mock_serp_results(query)
+    
+    cache_key = make_key(" ".join(query.lower().split()))
+    cached = await response_cache.get("serp", cache_key)
+    if cached is not None:
+        logger.info(f"SERP results served from cache: {query}")
+        return cached
+    
+    logger.info(f"Searching SERP for: {query}")
+    
+    try:
+        async for attempt in upstream_retrying():
+            with attempt:
+                async with _serp_sem:
+                    response = await get_http_client().get(
+                        "https://serpapi.com/search",
+                        params={
+                            "q": query,
+                            "api_key": SERP_API_KEY,
+                            "num": 10,
+                            "engine": "google"
+                        },
+                        timeout=30.0
+                    )
+                    response.raise_for_status()
+        data = orjson.loads(response.content)
+        
+        organic_results = data.get("organic_results", [])[:10]
+        await response_cache.set("serp", cache_key, organic_results, SERP_CACHE_TTL)
+        return organic_results
+    
+    except Exception as e:
+        logger.error(f"SERP API error: {str(e)}")
+        return generate_mock_serp_results(query)
+
+
+def generate_mock_serp_results(query: str) -> List[Dict]:
+    """Generate mock SERP results for testing"""
+    return [
+        {
+            "position": i + 1,
+            "title": f"Result {i + 1}: {query} - Example Site",
+            "link": f"https://example{i + 1}.com/{query.replace(' ', '-')}",
+            "snippet": f"This is a comprehensive guide about {query}. Learn everything you need to know..."
+        }
+        for i in range(10)
+    ]
+
+
+def build_auditor_messages(url: str, scraped_data: Dict[str, Any], signals: Dict[str, Any]) -> List[Dict]:
+    """Build the Page Auditor chat messages from a scrape and its extracted signals"""
+    markdown_content = scraped_data.get("markdown", "")
+    
+    # Prepare prompt for LLM analysis: exact signals plus a short body excerpt
+    analysis_prompt = _AUDITOR_PROMPT(
+        url=url,
+        signals=orjson.dumps(signals, option=orjson.OPT_INDENT_2).decode(),
+        content_chars=AUDITOR_CONTENT_CHARS,
+        content=markdown_content[:AUDITOR_CONTENT_CHARS]
+    )
+
+    return [
+        _AUDITOR_SYSTEM_MESSAGE,
+        {"role": "user", "content": analysis_prompt}
+    ]
+
+
+def assemble_page_audit(signals: Dict[str, Any], findings: Dict[str, Any]) -> PageAuditOutput:
+    """Merge the Page Auditor's judgement into the deterministic audit skeleton"""
+    audit_results = build_audit_skeleton(signals)
+    audit_results["content_summary"] = findings.get("content_summary") or ""
+    audit_results["technical_findings"] = findings.get("technical_findings") or []
+    audit_results["content_opportunities"] = findings.get("content_opportunities") or []
+    audit_results["link_counts"]["notes"] = findings.get("link_notes") or ""
+    
+    return build_page_audit({
+        "audit_results": audit_results,
+        "target_keywords": findings.get("target_keywords") or {}
+    })
+
+
+async def agent_page_auditor(url: str) -> PageAuditOutput:
+    """
+    Agent 1: Page Auditor
+    Scrapes the URL and performs on-page SEO analysis
+    """
+    logger.info(f"[Agent 1] Page Auditor analyzing: {url}")
+    
+    # Scrape the page
+    scraped_data = await scrape_with_firecrawl(url)
+    
+    signals = extract_seo_signals(url, scraped_data)
+    messages = build_auditor_messages(url, scraped_data, signals)
+    
+    response = await call_llm(
+        messages,
+        response_format=_AUDITOR_RESPONSE_FORMAT,
+        max_tokens=1200,
+        json_mode=True,
+        model=LLM_MODELS["auditor"]
+    )
+    
+    findings = _parse_agent_json(response, "Failed to parse audit results")
+    return assemble_page_audit(signals, findings)
+
+
+async def agent_serp_analyst(primary_keyword: str) -> SerpAnalysis:
+    """
+    Agent 2: SERP Analyst
+    Researches competitive landscape for the primary keyword
+    """
+    logger.info(f"[Agent 2] SERP Analyst researching: {primary_keyword}")
+    
+    # Get SERP results
+    serp_results = await search_serp(primary_keyword)
+    
+    # Prepare SERP data for analysis
+    serp_summary = orjson.dumps(serp_results[:10], option=orjson.OPT_INDENT_2).decode()
+    
+    analysis_prompt = _SERP_PROMPT(primary_keyword=primary_keyword, serp_summary=serp_summary)
+
+    messages = [
+        _SERP_SYSTEM_MESSAGE,
+        {"role": "user", "content": analysis_prompt}
+    ]
+    
+    response = await call_llm(
+        messages,
+        response_format=_SERP_RESPONSE_FORMAT,
+        max_tokens=3000,
+        json_mode=True,
+        model=LLM_MODELS["serp"]
+    )
+    
+    serp_data = _parse_agent_json(response, "Failed to parse SERP analysis")
+    serp_data.setdefault("primary_keyword", primary_keyword)
+    return build_serp_analysis(serp_data)
+
+
+def build_advisor_messages(
+    url: str,
+    page_audit: PageAuditOutput,
+    serp_analysis: SerpAnalysis
+) -> List[Dict]:
+    """Build the Optimization Advisor chat messages from the audit and SERP data"""
+    report_prompt = _ADVISOR_PROMPT(
+        url=url,
+        page_audit=orjson.dumps(page_audit.model_dump(), option=orjson.OPT_INDENT_2).decode(),
+        serp_analysis=orjson.dumps(serp_analysis.model_dump(), option=orjson.OPT_INDENT_2).decode()
+    )
+
+    return [
+        _ADVISOR_SYSTEM_MESSAGE,
+        {"role": "user", "content": report_prompt}
+    ]
+
+
+async def agent_optimization_advisor(
+    url: str,
+    page_audit: PageAuditOutput,
+    serp_analysis: SerpAnalysis
+) -> str:
+    """
+    Agent 3: Optimization Advisor
+    Synthesizes audit and SERP data into actionable report
+    """
+    logger.info("[Agent 3] Optimization Advisor generating report")
+    
+    messages = build_advisor_messages(url, page_audit, serp_analysis)
+    report = await call_llm(messages, max_tokens=4000, model=LLM_MODELS["advisor"])
+    
+    return report.strip()
+
+
+async def stream_optimization_advisor(
+    url: str,
+    page_audit: PageAuditOutput,
+    serp_analysis: SerpAnalysis
+) -> AsyncIterator[str]:
+    """
+    Agent 3: Optimization Advisor (streaming)
+    Yields the Markdown report incrementally as it is generated
+    """
+    logger.info("[Agent 3] Optimization Advisor streaming report")
+    
+    messages = build_advisor_messages(url, page_audit, serp_analysis)
+    async for delta in stream_llm(messages, max_tokens=4000, model=LLM_MODELS["advisor"]):
+        yield delta
+
+
+# =============================================================================
+# API Endpoints
+# =============================================================================
+
+def new_audit_id() -> str:
+    """Generate a unique, time-ordered audit id"""
+    return f"audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def new_batch_id() -> str:
+    """Generate a unique, time-ordered batch audit id"""
+    return f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+async def save_audit(response: AuditResponse) -> None:
+    """Persist an audit record so it can be fetched by id"""
+    await record_store.set("audit", response.audit_id, response.model_dump(), AUDIT_RESULT_TTL)
+
+
+async def load_audit(audit_id: str) -> Optional[AuditResponse]:
+    """Load a persisted audit record; an unreadable record is treated as missing"""
+    data = await record_store.get("audit", audit_id)
+    if data is None:
+        return None
+    try:
+        return AuditResponse.model_validate(data)
+    except ValidationError as e:
+        logger.warning(f"Discarding invalid audit record {audit_id}: {e}")
+        return None
+
+
+async def get_recent_audit(url: str) -> Optional[AuditResponse]:
+    """Return the last completed audit of this URL if it is still within AUDIT_REUSE_TTL"""
+    audit_id = await record_store.get("audit_url", make_key(url))
+    if audit_id is None:
+        return None
+    return await load_audit(audit_id)
+
+
+async def save_completed_audit(
+    url: str,
+    audit_id: str,
+    page_audit: PageAuditOutput,
+    serp_analysis: SerpAnalysis,
+    report: str
+) -> AuditResponse:
+    """Persist a completed audit and point repeat requests for its URL at it"""
+    response = AuditResponse(
+        status="completed",
+        audit_id=audit_id,
+        page_audit=page_audit,
+        serp_analysis=serp_analysis,
+        report=report,
+        timestamp=datetime.now().isoformat()
+    )
+    await save_audit(response)
+    if AUDIT_REUSE_TTL > 0:
+        await record_store.set("audit_url", make_key(url), audit_id, AUDIT_REUSE_TTL)
+    return response
+
+
+async def execute_audit(url: str, audit_id: str) -> AuditResponse:
+    """
+    Runs the complete 3-agent SEO audit workflow for one URL and persists
+    the outcome (completed/failed) under audit_id
+    """
+    try:
+        logger.info(f"Starting SEO audit {audit_id} for: {url}")
+        
+        # Agent 1: Page Auditor
+        page_audit = await agent_page_auditor(url)
+        logger.info(f"Page audit complete. Primary keyword: {page_audit.target_keywords.primary_keyword}")
+        
+        # Agent 2: SERP Analyst
+        serp_analysis = await agent_serp_analyst(page_audit.target_keywords.primary_keyword)
+        logger.info(f"SERP analysis complete. Found {len(serp_analysis.top_10_results)} competitors")
+        
+        # Agent 3: Optimization Advisor
+        report = await agent_optimization_advisor(url, page_audit, serp_analysis)
         logger.info("Optimization report generated")
         
-        return AuditResponse(
-            status="completed",
+        return await save_completed_audit(url, audit_id, page_audit, serp_analysis, report)
+    
+    except HTTPException as e:
+        await save_audit(AuditResponse(
+            status="failed",
             audit_id=audit_id,
-            page_audit=page_audit,
-            serp_analysis=serp_analysis,
-            report=report,
+            error=str(e.detail),
             timestamp=datetime.now().isoformat()
-        )
-    
-    except HTTPException:
+        ))
         raise
     except Exception as e:
         logger.error(f"Audit failed: {str(e)}", exc_info=True)
-        return AuditResponse(
+        response = AuditResponse(
             status="failed",
             audit_id=audit_id,
             error=str(e),
             timestamp=datetime.now().isoformat()
         )
+        await save_audit(response)
+        return response
+
+
+# In-flight audits keyed by URL, so concurrent requests for the same URL
+# share one pipeline run (single-flight) instead of each starting their own
+_inflight_audits: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+# Pipeline tasks, referenced so they are not garbage-collected mid-run
+_audit_tasks: Set[asyncio.Task] = set()
+
+
+def _settle(outcome: asyncio.Future, error: Optional[BaseException], result: Any = None) -> None:
+    """Resolve an in-flight audit's shared outcome with the run's result or error"""
+    if isinstance(error, asyncio.CancelledError):
+        outcome.cancel()
+    elif error is not None:
+        outcome.set_exception(error)
+        # Mark the exception as retrieved; it is already persisted or re-raised
+        outcome.exception()
+    else:
+        outcome.set_result(result)
+
+
+async def start_audit(url: str) -> Tuple[str, asyncio.Future]:
+    """
+    Start the audit of a URL, or join the run already in flight for it
+    A new run's processing record is persisted before the run starts, so the
+    audit_id can be fetched immediately and a fast failure is never
+    overwritten by it.
+    """
+    url_key = make_key(url)
+    inflight = _inflight_audits.get(url_key)
+    if inflight is not None:
+        logger.info(f"Joining in-flight audit {inflight[0]} for: {url}")
+        return inflight
+    
+    # Registered before the first await so concurrent requests join this run
+    audit_id = new_audit_id()
+    outcome = asyncio.get_running_loop().create_future()
+    _inflight_audits[url_key] = (audit_id, outcome)
+    
+    try:
+        await save_audit(AuditResponse(
+            status="processing",
+            audit_id=audit_id,
+            timestamp=datetime.now().isoformat()
+        ))
+    except BaseException as e:
+        _inflight_audits.pop(url_key, None)
+        _settle(outcome, e)
+        raise
+    
+    task = asyncio.create_task(execute_audit(url, audit_id))
+    _audit_tasks.add(task)
+    
+    def _finished(done: asyncio.Task) -> None:
+        _audit_tasks.discard(done)
+        _inflight_audits.pop(url_key, None)
+        if done.cancelled():
+            _settle(outcome, asyncio.CancelledError())
+        else:
+            _settle(outcome, done.exception(), None if done.exception() else done.result())
+    
+    task.add_done_callback(_finished)
+    return audit_id, outcome
+
+
+async def audit_url(url: str) -> AuditResponse:
+    """Return a recent completed audit of the URL, or run (or join) one"""
+    recent = await get_recent_audit(url)
+    if recent is not None:
+        logger.info(f"Returning recent audit {recent.audit_id} for: {url}")
+        return recent
+    
+    _, run = await start_audit(url)
+    # Shielded so a disconnecting client does not cancel a run others may share
+    return await asyncio.shield(run)
+
+
+@router.post("/audit", response_model=AuditResponse)
+async def run_seo_audit(request: AuditRequest):
+    """
+    Main endpoint: Runs complete 3-agent SEO audit workflow
+    Reuses a recent completed audit of the same URL and joins an in-flight one.
+    """
+    return await audit_url(str(request.url))
+
+
+@router.post("/audit/bulk", response_model=BulkAuditResponse)
+async def run_bulk_seo_audit(request: BulkAuditRequest):
+    """
+    Bulk endpoint: runs full audits for several URLs concurrently, at most
+    max_concurrency at a time; one URL failing does not affect the others
+    """
+    semaphore = asyncio.Semaphore(request.max_concurrency)
+    
+    async def audit_one(url: str) -> AuditResponse:
+        # Empty until a run exists; a failed lookup or record write leaves nothing to fetch
+        audit_id = ""
+        async with semaphore:
+            try:
+                recent = await get_recent_audit(url)
+                if recent is not None:
+                    return recent
+                
+                audit_id, run = await start_audit(url)
+                return await asyncio.shield(run)
+            except Exception as e:
+                # Reported in place so one URL (or record store error) never fails the group
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"Bulk audit failed for {url}: {detail}")
+                return AuditResponse(
+                    status="failed",
+                    audit_id=audit_id,
+                    error=str(detail),
+                    timestamp=datetime.now().isoformat()
+                )
+    
+    urls = [str(url) for url in request.urls]
+    logger.info(f"Starting bulk audit of {len(urls)} URLs (max_concurrency={request.max_concurrency})")
+    results = await asyncio.gather(*(audit_one(url) for url in urls))
+    
+    completed = sum(1 for result in results if result.status == "completed")
+    return BulkAuditResponse(
+        completed=completed,
+        failed=len(results) - completed,
+        results=results,
+        timestamp=datetime.now().isoformat()
+    )
+
+
+@router.post("/audit/async", response_model=AuditResponse, status_code=202)
+async def start_seo_audit(request: AuditRequest, response: Response):
+    """
+    Async endpoint: starts the audit in the background and returns 202 with
+    its audit_id immediately; poll GET /audit/{audit_id} for the result
+    """
+    url = str(request.url)
+    
+    recent = await get_recent_audit(url)
+    if recent is not None:
+        response.status_code = 200
+        return recent
+    
+    audit_id, _ = await start_audit(url)
+    return AuditResponse(
+        status="processing",
+        audit_id=audit_id,
+        timestamp=datetime.now().isoformat()
+    )
+
+
+@router.get("/audit/{audit_id}", response_model=AuditResponse)
+async def get_seo_audit(audit_id: str):
+    """Fetch a persisted audit (processing, completed or failed) by id"""
+    audit = await load_audit(audit_id)
+    if audit is None:
+        raise HTTPException(status_code=404, detail="Audit not found or expired")
+    return audit
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    """Encode one server-sent event with a JSON payload"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+@router.post("/audit/stream")
+async def stream_seo_audit(request: AuditRequest):
+    """
+    Streaming endpoint: runs the 3-agent workflow as server-sent events
+    Emits page_audit and serp_analysis once each stage completes, then the
+    report as incremental report events, and finally done (or error).
+    The outcome is persisted, so the audit_id can be fetched afterwards.
+    """
+    url = str(request.url)
+    audit_id = new_audit_id()
+    
+    async def event_stream() -> AsyncIterator[bytes]:
+        try:
+            logger.info(f"Starting streaming SEO audit for: {url}")
+            
+            page_audit = await agent_page_auditor(url)
+            yield format_sse("page_audit", page_audit.model_dump())
+            
+            serp_analysis = await agent_serp_analyst(page_audit.target_keywords.primary_keyword)
+            yield format_sse("serp_analysis", serp_analysis.model_dump())
+            
+            report_parts = []
+            async for delta in stream_optimization_advisor(url, page_audit, serp_analysis):
+                report_parts.append(delta)
+                yield format_sse("report", delta)
+            
+            response = await save_completed_audit(
+                url, audit_id, page_audit, serp_analysis, "".join(report_parts).strip()
+            )
+            yield format_sse("done", {"audit_id": audit_id, "timestamp": response.timestamp})
+        
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Streaming audit failed: {detail}", exc_info=True)
+            try:
+                await save_audit(AuditResponse(
+                    status="failed",
+                    audit_id=audit_id,
+                    error=str(detail),
+                    timestamp=datetime.now().isoformat()
+                ))
+            except Exception as save_error:
+                logger.warning(f"Could not persist failed streaming audit {audit_id}: {str(save_error)}")
+            yield format_sse("error", {"audit_id": audit_id, "error": detail})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Background batch submissions, referenced so they are not garbage-collected mid-run
+_batch_tasks: Set[asyncio.Task] = set()
+
+
+async def execute_batch_audit(batch_id: str, urls: List[str], state: Dict[str, Any]) -> None:
+    """
+    Scrapes every URL and submits the Page Auditor step for all of them as
+    one OpenAI batch, recording progress in the batch state under batch_id
+    """
+    try:
+        logger.info(f"Scraping {len(urls)} URLs for batch audit {batch_id}")
+        scrapes = await asyncio.gather(*(scrape_with_firecrawl(url) for url in urls), return_exceptions=True)
+        
+        batch_requests = []
+        for index, (url, scraped) in enumerate(zip(urls, scrapes)):
+            if isinstance(scraped, BaseException):
+                state["failed"][url] = scraped.detail if isinstance(scraped, HTTPException) else str(scraped)
+                continue
+            
+            custom_id = str(index)
+            signals = extract_seo_signals(url, scraped)
+            state["requests"][custom_id] = {"url": url, "signals": signals}
+            batch_requests.append({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": LLM_MODELS["auditor"],
+                    "messages": build_auditor_messages(url, scraped, signals),
+                    "max_tokens": 1200,
+                    "temperature": 0.0,
+                    "response_format": _AUDITOR_RESPONSE_FORMAT
+                }
+            })
+        
+        if not batch_requests:
+            raise HTTPException(status_code=502, detail="None of the URLs could be scraped")
+        
+        batch = await submit_openai_batch(batch_requests)
+        state["openai_batch_id"] = batch["id"]
+        state["status"] = batch["status"]
+        logger.info(f"Submitted OpenAI batch {batch['id']} with {len(batch_requests)} page audits for {batch_id}")
+    
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"Batch audit {batch_id} failed: {detail}", exc_info=True)
+        state["status"] = "failed"
+        state["error"] = str(detail)
+    
+    await record_store.set("batch", batch_id, state, BATCH_STATE_TTL)
+
+
+@router.post("/audit/batch", response_model=BatchAuditResponse, status_code=202)
+async def submit_batch_audit(request: BatchAuditRequest):
+    """
+    Bulk endpoint: returns a batch handle immediately, then scrapes every URL
+    in the background and submits the Page Auditor step for all of them as
+    one OpenAI batch (half price, results within 24h).
+    Poll GET /audit/batch/{batch_id} for the page audits.
+    """
+    if LLM_PROVIDER != "openai":
+        raise HTTPException(status_code=400, detail="Batch audits require LLM_PROVIDER=openai")
+    
+    urls = list(dict.fromkeys(str(url) for url in request.urls))
+    batch_id = new_batch_id()
+    state = {"status": "scraping", "openai_batch_id": None, "requests": {}, "failed": {}, "error": None}
+    # Persisted before returning so an immediate poll finds the handle
+    await record_store.set("batch", batch_id, state, BATCH_STATE_TTL)
+    
+    task = asyncio.create_task(execute_batch_audit(batch_id, urls, state))
+    _batch_tasks.add(task)
+    task.add_done_callback(_batch_tasks.discard)
+    
+    return BatchAuditResponse(
+        batch_id=batch_id,
+        status=state["status"],
+        timestamp=datetime.now().isoformat()
+    )
+
+
+# OpenAI batch statuses after which the output and error files no longer change
+_BATCH_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def collect_batch_results(output: bytes, state: Dict[str, Any], result: BatchAuditResponse) -> None:
+    """Record each line of a batch output or error file as a page audit or a failure"""
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        item = orjson.loads(line)
+        entry = state["requests"].get(item.get("custom_id"))
+        if entry is None:
+            continue
+        
+        body = (item.get("response") or {}).get("body") or {}
+        choices = body.get("choices") or []
+        if item.get("error") or not choices:
+            result.failed[entry["url"]] = str(item.get("error") or body.get("error") or "No completion returned")
+            continue
+        
+        try:
+            findings = _parse_agent_json(choices[0]["message"]["content"], "Failed to parse audit results")
+            result.page_audits[entry["url"]] = assemble_page_audit(entry["signals"], findings)
+        except HTTPException as e:
+            result.failed[entry["url"]] = e.detail
+
+
+@router.get("/audit/batch/{batch_id}", response_model=BatchAuditResponse)
+async def get_batch_audit(batch_id: str):
+    """
+    Poll a batch audit; page audits are included once the batch has finished
+    A finished batch's result is stored and served without calling OpenAI again.
+    """
+    state = await record_store.get("batch", batch_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired batch id")
+    
+    if state.get("result") is not None:
+        return BatchAuditResponse.model_validate(state["result"])
+    
+    if state["openai_batch_id"] is None:
+        # Still scraping, or failed before a batch was created
+        return BatchAuditResponse(
+            batch_id=batch_id,
+            status=state["status"],
+            failed=state["failed"],
+            error=state["error"],
+            timestamp=datetime.now().isoformat()
+        )
+    
+    batch = await get_openai_batch(state["openai_batch_id"])
+    result = BatchAuditResponse(
+        batch_id=batch_id,
+        status=batch["status"],
+        failed=dict(state["failed"]),
+        timestamp=datetime.now().isoformat()
+    )
+    if batch["status"] not in _BATCH_FINAL_STATUSES:
+        return result
+    
+    # Successful requests are in the output file, failed ones in the error file
+    for file_id in (batch.get("output_file_id"), batch.get("error_file_id")):
+        if file_id:
+            collect_batch_results(await download_openai_file(file_id), state, result)
+    
+    for entry in state["requests"].values():
+        if entry["url"] not in result.page_audits and entry["url"] not in result.failed:
+            result.failed[entry["url"]] = f"No result returned (batch {batch['status']})"
+    
+    if batch["status"] != "completed":
+        errors = (batch.get("errors") or {}).get("data") or []
+        result.error = "; ".join(error.get("message", "") for error in errors) or f"Batch {batch['status']}"
+    elif not result.page_audits:
+        result.error = "No page audits succeeded"
+    
+    state["result"] = result.model_dump()
+    await record_store.set("batch", batch_id, state, BATCH_STATE_TTL)
+    return result
 
 
 @router.get("/status")
@@ -670,8 +1826,9 @@ async def get_status():
         "api": "operational",
         "firecrawl": "configured" if FIRECRAWL_API_KEY else "not_configured",
         "llm_provider": LLM_PROVIDER,
-        "llm_model": LLM_MODEL,
+        "llm_models": LLM_MODELS,
         "llm_configured": bool(OPENAI_API_KEY or ANTHROPIC_API_KEY),
-        "serp": "configured" if SERP_API_KEY else "mock_mode"
+        "serp": "configured" if SERP_API_KEY else "mock_mode",
+        "cache": response_cache.stats
     }
     return status
@@ -0,0 +1,171 @@
+"""
+Response cache for upstream calls (LLM completions, Firecrawl scrapes, SERP queries)
+Exact-match cache keyed by a SHA-256 of the request:
+- Redis (redis.asyncio) when REDIS_URL is set
+- In-process TTL/LRU cache otherwise
+
+Also the record store for application state (audits, batch runs), which
+shares the Redis connection but is never evicted before its TTL.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import heapq
+import logging
+import os
+import time
+
+import orjson
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis is optional; fall back to the in-memory cache
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+
+def make_key(*parts: Any) -> str:
+    """Build a stable cache key from JSON-serializable request parts"""
+    raw = orjson.dumps(parts, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.sha256(raw).hexdigest()
+
+
+class TTLCache:
+    """Small in-memory LRU cache with per-entry expiry"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+def connect_redis(redis_url: str):
+    """Return a Redis client for redis_url, or None to use in-memory storage"""
+    if not redis_url:
+        return None
+    if aioredis is None:
+        logger.warning("REDIS_URL is set but redis is not installed, using in-memory cache")
+        return None
+    return aioredis.from_url(redis_url)
+
+
+class ResponseCache:
+    """Namespaced exact-match cache with hit/miss accounting"""
+
+    def __init__(self, redis=None, maxsize: int = 1024):
+        self._memory = TTLCache(maxsize)
+        self._redis = redis
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self._redis is not None else "memory"
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "hits": self.hits, "misses": self.misses}
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        full_key = f"{namespace}:{key}"
+        value = None
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(full_key)
+                if raw is not None:
+                    value = orjson.loads(raw)
+            except Exception as e:
+                logger.warning(f"Redis cache read failed: {str(e)}")
+        else:
+            value = self._memory.get(full_key)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: int) -> None:
+        full_key = f"{namespace}:{key}"
+        if self._redis is not None:
+            try:
+                await self._redis.setex(full_key, ttl, orjson.dumps(value))
+            except Exception as e:
+                logger.warning(f"Redis cache write failed: {str(e)}")
+        else:
+            self._memory.set(full_key, value, ttl)
+
+
+class RecordStore:
+    """
+    Namespaced store for records that must survive until their TTL (audits,
+    batch state): no LRU eviction, no hit/miss accounting, and Redis errors
+    are raised rather than treated as misses
+    """
+
+    def __init__(self, redis=None):
+        self._redis = redis
+        self._data: Dict[str, Tuple[float, Any]] = {}
+        self._expiry: List[Tuple[float, str]] = []
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            entry = self._data.get(key)
+            # Skip heap entries for keys that were overwritten since
+            if entry is not None and entry[0] == expires_at:
+                del self._data[key]
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        full_key = f"{namespace}:{key}"
+        if self._redis is not None:
+            raw = await self._redis.get(full_key)
+            return orjson.loads(raw) if raw is not None else None
+
+        self._purge_expired()
+        entry = self._data.get(full_key)
+        return entry[1] if entry is not None else None
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: int) -> None:
+        full_key = f"{namespace}:{key}"
+        if self._redis is not None:
+            await self._redis.setex(full_key, ttl, orjson.dumps(value))
+            return
+
+        self._purge_expired()
+        expires_at = time.monotonic() + ttl
+        self._data[full_key] = (expires_at, value)
+        heapq.heappush(self._expiry, (expires_at, full_key))
+
+
+_redis = connect_redis(REDIS_URL)
+response_cache = ResponseCache(_redis, CACHE_MAX_ENTRIES)
+record_store = RecordStore(_redis)
+
+
+async def close_redis() -> None:
+    """Close the Redis connection shared by the response cache and record store"""
+    if _redis is not None:
+        await _redis.aclose()
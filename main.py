@@ -4,7 +4,7 @@ FastAPI + Firecrawl + OpenAI/Anthropic for comprehensive SEO analysis
 """
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from contextlib import asynccontextmanager
@@ -13,7 +13,16 @@ import sys
 from pathlib import Path
 
 # Import API router
-from api import router as api_router
+from api import (
+    router as api_router,
+    create_http_client,
+    set_http_client,
+    create_llm_session,
+    set_llm_session,
+    warm_up_connections,
+    PREWARM_CONNECTIONS,
+)
+from cache import close_redis
 
 # Configure logging
 logging.basicConfig(
@@ -32,10 +41,21 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager for startup and shutdown events"""
     # Startup
     logger.info("🚀 Starting SEO Audit Team Application...")
+    app.state.http = create_http_client()
+    set_http_client(app.state.http)
+    app.state.aio = create_llm_session()
+    set_llm_session(app.state.aio)
+    if PREWARM_CONNECTIONS:
+        await warm_up_connections()
     logger.info("✅ Application started successfully")
     yield
     # Shutdown
     logger.info("👋 Shutting down SEO Audit Team Application...")
+    set_http_client(None)
+    set_llm_session(None)
+    await app.state.http.aclose()
+    await app.state.aio.close()
+    await close_redis()
 
 
 # Initialize FastAPI app
@@ -44,6 +64,7 @@ app = FastAPI(
     description="Production-grade SEO audit application powered by AI agents",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/api/docs",
     redoc_url="/api/redoc"
 )
@@ -0,0 +1,28 @@
+"""Tests for the in-memory response cache and record store"""
+
+import asyncio
+
+from cache import RecordStore, ResponseCache
+
+
+def test_record_store_never_evicts_before_ttl():
+    async def run():
+        cache = ResponseCache(maxsize=2)
+        store = RecordStore()
+        for i in range(10):
+            await cache.set("llm", str(i), i, 60)
+            await store.set("audit", str(i), i, 60)
+        return await cache.get("llm", "0"), await store.get("audit", "0")
+
+    assert asyncio.run(run()) == (None, 0)
+
+
+def test_record_store_expires_and_keeps_overwrites():
+    async def run():
+        store = RecordStore()
+        await store.set("audit", "a", "processing", 0)
+        await store.set("audit", "b", "processing", 0)
+        await store.set("audit", "b", "completed", 60)
+        return await store.get("audit", "a"), await store.get("audit", "b")
+
+    assert asyncio.run(run()) == (None, "completed")
@@ -0,0 +1,59 @@
+"""Tests for deterministic page signal extraction"""
+
+from api import extract_seo_signals
+
+
+def _scrape(markdown, links=None, metadata=None):
+    return {"markdown": markdown, "links": links or [], "metadata": metadata or {}}
+
+
+def test_word_count_uses_visible_text_only():
+    markdown = (
+        "# Fresh Coffee Beans\n"
+        "\n"
+        "Roasted daily in [our shop](https://www.example.com/a-b-c/d-e-f).\n"
+        "![Bag of beans](https://cdn.example.com/img/beans-large-1200.png)\n"
+        "\n"
+        "```python\n"
+        "print('not page copy at all')\n"
+        "```\n"
+        "See https://www.example.com/some/long-path for more.\n"
+    )
+    signals = extract_seo_signals("https://example.com/", _scrape(markdown))
+    # "Fresh Coffee Beans", "Roasted daily in our shop", "See for more"
+    assert signals["word_count"] == 11
+
+
+def test_headings_skip_code_blocks_and_strip_inline_markup():
+    markdown = "# [Home](https://example.com/)\n\n```\n# not a heading\n```\n\n## Sub **one** and `two`\n### *Three* __four__\n"
+    signals = extract_seo_signals("https://example.com/", _scrape(markdown))
+    assert signals["headings"] == [
+        {"tag": "h1", "text": "Home"},
+        {"tag": "h2", "text": "Sub one and two"},
+        {"tag": "h3", "text": "Three four"},
+    ]
+
+
+def test_title_and_meta_come_from_metadata():
+    signals = extract_seo_signals(
+        "https://example.com/",
+        _scrape("", metadata={"title": "Coffee", "description": "Beans", "keywords": None}),
+    )
+    assert signals["title"] == "Coffee"
+    assert signals["meta_description"] == "Beans"
+    assert signals["meta_keywords"] == ""
+
+
+def test_link_counts_skip_non_page_links():
+    links = [
+        "https://www.example.com/about",
+        "http://example.com/blog/post",
+        "/contact",
+        "https://other.org/ref",
+        "mailto:hi@example.com",
+        "tel:+15551234",
+        "javascript:void(0)",
+        "#top",
+    ]
+    signals = extract_seo_signals("https://example.com/", _scrape("", links=links))
+    assert signals["link_counts"] == {"internal": 3, "external": 1, "total": 4}